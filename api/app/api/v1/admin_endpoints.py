@@ -0,0 +1,52 @@
+from fastapi import APIRouter, HTTPException, Header, status
+from pydantic import BaseModel, Field
+from typing import Optional, List, Literal
+from app.services.profiling_service import profiling_service, ProfilingBusyError
+
+admin_router = APIRouter()
+
+class ProfileRequest(BaseModel):
+    duration: float = Field(10.0, gt=0)
+    mode: Literal["sampling", "cprofile"] = "sampling"
+    path_filter: Optional[str] = None
+    interval: float = Field(0.005, ge=0.001, le=1.0)
+    top_n: int = Field(30, ge=1, le=500)
+
+class ProfileFunction(BaseModel):
+    function: str
+    calls: Optional[int] = None
+    samples: Optional[int] = None
+    total_time: float
+    cumulative_time: float
+
+class ProfileResponse(BaseModel):
+    mode: str
+    duration: float
+    path_filter: Optional[str] = None
+    samples: Optional[int] = None
+    interval: Optional[float] = None
+    collapsed: Optional[str] = None
+    top: List[ProfileFunction]
+
+
+@admin_router.post("/profile", response_model=ProfileResponse)
+async def profile_worker(request_body: ProfileRequest, x_admin_token: Optional[str] = Header(None)):
+    if not profiling_service.is_authorized(x_admin_token):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid admin token"
+        )
+
+    try:
+        return await profiling_service.profile(
+            duration=request_body.duration,
+            mode=request_body.mode,
+            path_filter=request_body.path_filter,
+            interval=request_body.interval,
+            top_n=request_body.top_n,
+        )
+    except ProfilingBusyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
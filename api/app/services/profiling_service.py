@@ -0,0 +1,277 @@
+import os
+import sys
+import hmac
+import pstats
+import asyncio
+import cProfile
+import inspect
+import logging
+import threading
+from collections import Counter
+from typing import Optional, Dict, Any, List, Tuple, Set
+
+DEFAULT_MAX_PROFILE_SECONDS = 60.0
+
+SAMPLING_MODE = "sampling"
+CPROFILE_MODE = "cprofile"
+
+_COROUTINE_FLAGS = inspect.CO_COROUTINE | inspect.CO_ASYNC_GENERATOR
+
+
+class ProfilingBusyError(RuntimeError):
+    pass
+
+
+# Settings are read on use rather than at import: main.py imports the routers
+# before migration_util runs load_dotenv(), so values from .env arrive late.
+def _admin_token() -> str:
+    return os.getenv("PROFILING_ADMIN_TOKEN", "")
+
+
+def _max_profile_seconds() -> float:
+    try:
+        value = float(os.getenv("PROFILING_MAX_SECONDS", ""))
+    except ValueError:
+        return DEFAULT_MAX_PROFILE_SECONDS
+    return value if value > 0 else DEFAULT_MAX_PROFILE_SECONDS
+
+
+class _ProfilingSession:
+    """State of one profiling session; requests keep a handle to the session they joined."""
+
+    def __init__(self, path_filter: Optional[str]):
+        self.path_filter = path_filter
+        self.in_flight = 0
+        self.profiler: Optional[cProfile.Profile] = None
+        # Frames of ProfilingMiddleware.__call__ for matching requests. A loop
+        # thread sample belongs to a matching request iff one of them is on its stack.
+        self.request_frames: Set[Any] = set()
+
+
+class _StackSampler:
+    """Background thread that snapshots the event loop thread's stack at a fixed interval."""
+
+    def __init__(self, thread_id: int, interval: float, request_frames: Optional[Set[Any]] = None):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.request_frames = request_frames
+        self.stacks: Counter = Counter()
+        self.ticks = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiling-sampler", daemon=True)
+
+    @property
+    def samples(self) -> int:
+        return sum(self.stacks.values())
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.ticks += 1
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = self._sample(frame)
+            if stack:
+                self.stacks[stack] += 1
+
+    def _sample(self, frame) -> Optional[Tuple[str, ...]]:
+        frames = []
+        while frame is not None:
+            frames.append(frame)
+            frame = frame.f_back
+
+        # With no coroutine on the stack the loop is idle in select/poll (or
+        # running a bare callback), which is not time spent serving requests.
+        if not any(f.f_code.co_flags & _COROUTINE_FLAGS for f in frames):
+            return None
+        if self.request_frames is not None and not any(f in self.request_frames for f in frames):
+            return None
+
+        return tuple(_frame_label(f) for f in reversed(frames))
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class ProfilingService:
+    """On-demand, time-bounded profiling of the running worker.
+
+    Only one session runs at a time. While no session is active the request
+    hook is a single attribute check, so leaving it installed costs nothing.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._session: Optional[_ProfilingSession] = None
+
+    @property
+    def is_active(self) -> bool:
+        return self._session is not None
+
+    def is_authorized(self, token: Optional[str]) -> bool:
+        expected = _admin_token()
+        if not expected or not token:
+            return False
+        # compare_digest only accepts ASCII str, and headers arrive latin-1 decoded
+        return hmac.compare_digest(token.encode(), expected.encode())
+
+    def match(self, path: str) -> Optional[_ProfilingSession]:
+        session = self._session
+        if session is None or session.path_filter is None or session.path_filter not in path:
+            return None
+        return session
+
+    def request_started(self, session: _ProfilingSession, frame) -> None:
+        with self._lock:
+            session.request_frames.add(frame)
+            session.in_flight += 1
+            if session.in_flight == 1 and session.profiler is not None:
+                session.profiler.enable()
+
+    def request_finished(self, session: _ProfilingSession, frame) -> None:
+        with self._lock:
+            session.request_frames.discard(frame)
+            session.in_flight -= 1
+            if session.in_flight == 0 and session.profiler is not None:
+                session.profiler.disable()
+
+    async def profile(
+        self,
+        duration: float,
+        mode: str = SAMPLING_MODE,
+        path_filter: Optional[str] = None,
+        interval: float = 0.005,
+        top_n: int = 30,
+    ) -> Dict[str, Any]:
+        session = _ProfilingSession(path_filter or None)
+        with self._lock:
+            if self._session is not None:
+                raise ProfilingBusyError("A profiling session is already running")
+            self._session = session
+
+        duration = min(duration, _max_profile_seconds())
+        logging.info(f"Starting {mode} profiling session for {duration}s (filter={path_filter!r})")
+        try:
+            if mode == CPROFILE_MODE:
+                result = await self._run_cprofile(session, duration, top_n)
+            else:
+                result = await self._run_sampler(session, duration, interval, top_n)
+        finally:
+            with self._lock:
+                self._session = None
+
+        result.update({"mode": mode, "duration": duration, "path_filter": path_filter})
+        return result
+
+    async def _run_cprofile(self, session: _ProfilingSession, duration: float, top_n: int) -> Dict[str, Any]:
+        # cProfile hooks the thread it is enabled on, i.e. the event loop thread
+        # where the async handlers (and the embedder / auth calls they make) run.
+        # With a path filter it is only switched on while a matching request is
+        # in flight, so other requests interleaved on the loop are still counted.
+        # cProfile keeps no full call stacks, so there is no collapsed dump here.
+        profiler = cProfile.Profile()
+        with self._lock:
+            if session.path_filter is None or session.in_flight > 0:
+                profiler.enable()
+            session.profiler = profiler
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            with self._lock:
+                session.profiler = None
+                profiler.disable()
+
+        try:
+            stats = pstats.Stats(profiler).stats
+        except TypeError:
+            # pstats refuses to load a profile that never recorded anything
+            stats = {}
+        ranked = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)
+        top = [
+            {
+                "function": f"{func} ({os.path.basename(filename)}:{line})",
+                "calls": nc,
+                "total_time": round(tt, 6),
+                "cumulative_time": round(ct, 6),
+            }
+            for (filename, line, func), (cc, nc, tt, ct, callers) in ranked[:top_n]
+        ]
+        return {"collapsed": None, "top": top}
+
+    async def _run_sampler(
+        self, session: _ProfilingSession, duration: float, interval: float, top_n: int
+    ) -> Dict[str, Any]:
+        # profile() is awaited on the event loop, so this is the loop thread.
+        request_frames = session.request_frames if session.path_filter is not None else None
+        sampler = _StackSampler(threading.get_ident(), interval, request_frames)
+        sampler.start()
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            await asyncio.to_thread(sampler.stop)
+
+        seconds_per_tick = duration / sampler.ticks if sampler.ticks else 0.0
+        return {
+            "samples": sampler.samples,
+            "interval": interval,
+            "collapsed": self._to_collapsed(sampler.stacks),
+            "top": self._top_functions(sampler.stacks, seconds_per_tick, top_n),
+        }
+
+    @staticmethod
+    def _to_collapsed(stacks: Counter) -> str:
+        return "\n".join(f"{';'.join(stack)} {count}" for stack, count in stacks.most_common())
+
+    @staticmethod
+    def _top_functions(stacks: Counter, seconds_per_sample: float, top_n: int) -> List[Dict[str, Any]]:
+        cumulative: Counter = Counter()
+        own: Counter = Counter()
+        for stack, count in stacks.items():
+            for function in set(stack):
+                cumulative[function] += count
+            own[stack[-1]] += count
+
+        return [
+            {
+                "function": function,
+                "samples": count,
+                "total_time": round(own[function] * seconds_per_sample, 6),
+                "cumulative_time": round(count * seconds_per_sample, 6),
+            }
+            for function, count in cumulative.most_common(top_n)
+        ]
+
+
+class ProfilingMiddleware:
+    """Plain ASGI middleware that scopes a profiling session to matching requests."""
+
+    def __init__(self, app, profiling_service: ProfilingService):
+        self.app = app
+        self.profiling_service = profiling_service
+
+    async def __call__(self, scope, receive, send):
+        session = self.profiling_service.match(scope["path"]) if scope["type"] == "http" else None
+        if session is None:
+            await self.app(scope, receive, send)
+            return
+
+        # This coroutine's frame stays on the loop thread's stack whenever the
+        # request's own code is running, which is how samples are attributed.
+        frame = sys._getframe()
+        self.profiling_service.request_started(session, frame)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.profiling_service.request_finished(session, frame)
+
+
+profiling_service = ProfilingService()
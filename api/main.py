@@ -1,6 +1,7 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.v1.router import api_router
+from app.services.profiling_service import ProfilingMiddleware, profiling_service
 from migration_util import auto_migrate
 import logging
 
@@ -21,6 +22,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(ProfilingMiddleware, profiling_service=profiling_service)
+
 app.include_router(api_router, prefix="/api")
 
 @app.on_event("startup")
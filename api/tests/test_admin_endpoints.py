@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("fastapi")
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1.admin_endpoints import admin_router
+from app.services.profiling_service import profiling_service
+
+app = FastAPI()
+app.include_router(admin_router, prefix="/api/v1/admin")
+client = TestClient(app)
+
+URL = "/api/v1/admin/profile"
+
+
+@pytest.fixture(autouse=True)
+def admin_token(monkeypatch):
+    monkeypatch.setenv("PROFILING_ADMIN_TOKEN", "secret")
+
+
+def test_missing_or_wrong_token_is_forbidden():
+    assert client.post(URL, json={"duration": 0.01}).status_code == 403
+    assert client.post(URL, json={"duration": 0.01}, headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert client.post(URL, json={"duration": 0.01}, headers={"X-Admin-Token": "\u00e9".encode("latin-1")}).status_code == 403
+
+
+def test_unconfigured_token_is_forbidden(monkeypatch):
+    monkeypatch.setenv("PROFILING_ADMIN_TOKEN", "")
+    assert client.post(URL, json={"duration": 0.01}, headers={"X-Admin-Token": ""}).status_code == 403
+
+
+def test_duration_is_clamped_in_response(monkeypatch):
+    monkeypatch.setenv("PROFILING_MAX_SECONDS", "0.05")
+    response = client.post(URL, json={"duration": 30, "mode": "cprofile"}, headers={"X-Admin-Token": "secret"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["duration"] == 0.05
+    assert body["mode"] == "cprofile"
+    assert body["collapsed"] is None
+
+
+def test_busy_session_returns_conflict():
+    async def run():
+        session = asyncio.create_task(profiling_service.profile(0.2))
+        await asyncio.sleep(0.01)
+        try:
+            response = await asyncio.to_thread(
+                client.post, URL, json={"duration": 0.01}, headers={"X-Admin-Token": "secret"}
+            )
+        finally:
+            await session
+        return response
+
+    assert asyncio.run(run()).status_code == 409
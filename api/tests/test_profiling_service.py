@@ -0,0 +1,194 @@
+import time
+import asyncio
+from collections import Counter
+
+import pytest
+
+from app.services import profiling_service as profiling
+from app.services.profiling_service import (
+    CPROFILE_MODE,
+    ProfilingBusyError,
+    ProfilingMiddleware,
+    ProfilingService,
+)
+
+
+def burn(seconds):
+    end = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < end:
+        total += 1
+    return total
+
+
+def spin(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+async def busy_loop(work, rounds=20, seconds=0.02):
+    for _ in range(rounds):
+        work(seconds)
+        await asyncio.sleep(0)
+
+
+def test_is_authorized_requires_configured_token(monkeypatch):
+    service = ProfilingService()
+
+    monkeypatch.delenv("PROFILING_ADMIN_TOKEN", raising=False)
+    assert not service.is_authorized("anything")
+    assert not service.is_authorized("")
+
+    monkeypatch.setenv("PROFILING_ADMIN_TOKEN", "")
+    assert not service.is_authorized("anything")
+
+    monkeypatch.setenv("PROFILING_ADMIN_TOKEN", "secret")
+    assert not service.is_authorized(None)
+    assert not service.is_authorized("")
+    assert not service.is_authorized("wrong")
+    assert not service.is_authorized("\u00e9")
+    assert service.is_authorized("secret")
+
+
+def test_token_set_after_import_is_honoured(monkeypatch):
+    monkeypatch.delenv("PROFILING_ADMIN_TOKEN", raising=False)
+    service = ProfilingService()
+    assert not service.is_authorized("late")
+
+    monkeypatch.setenv("PROFILING_ADMIN_TOKEN", "late")
+    assert service.is_authorized("late")
+
+
+def test_second_session_is_rejected_while_one_is_running():
+    service = ProfilingService()
+
+    async def run():
+        first = asyncio.create_task(service.profile(0.1))
+        await asyncio.sleep(0.01)
+        with pytest.raises(ProfilingBusyError):
+            await service.profile(0.1)
+        await first
+        assert not service.is_active
+
+    asyncio.run(run())
+
+
+def test_duration_is_clamped_to_max(monkeypatch):
+    monkeypatch.setenv("PROFILING_MAX_SECONDS", "0.05")
+    result = asyncio.run(ProfilingService().profile(10))
+    assert result["duration"] == 0.05
+
+
+@pytest.mark.parametrize("value", [None, "", "abc", "0", "-5"])
+def test_max_seconds_falls_back_to_default(monkeypatch, value):
+    if value is None:
+        monkeypatch.delenv("PROFILING_MAX_SECONDS", raising=False)
+    else:
+        monkeypatch.setenv("PROFILING_MAX_SECONDS", value)
+    assert profiling._max_profile_seconds() == profiling.DEFAULT_MAX_PROFILE_SECONDS
+
+
+def test_to_collapsed_format():
+    stacks = Counter({("main", "handler", "leaf"): 3, ("main", "idle"): 1})
+    assert ProfilingService._to_collapsed(stacks) == "main;handler;leaf 3\nmain;idle 1"
+
+
+def test_top_functions_aggregation():
+    stacks = Counter({("main", "a", "b"): 3, ("main", "a"): 2, ("main", "rec", "rec"): 1})
+    top = {row["function"]: row for row in ProfilingService._top_functions(stacks, 0.01, 10)}
+
+    assert top["main"]["samples"] == 6
+    assert top["main"]["total_time"] == 0
+    assert top["a"]["cumulative_time"] == pytest.approx(0.05)
+    assert top["a"]["total_time"] == pytest.approx(0.02)
+    assert top["b"]["total_time"] == pytest.approx(0.03)
+    # recursive frames are counted once per sample
+    assert top["rec"]["samples"] == 1
+    assert len(ProfilingService._top_functions(stacks, 0.01, 2)) == 2
+
+
+def test_sampling_finds_hot_function_within_duration():
+    service = ProfilingService()
+
+    async def run():
+        result, _ = await asyncio.gather(service.profile(0.4, top_n=50), busy_loop(burn))
+        return result
+
+    result = asyncio.run(run())
+    functions = [row["function"] for row in result["top"]]
+    assert any(name.startswith("burn ") for name in functions)
+    assert all(row["cumulative_time"] <= result["duration"] for row in result["top"])
+
+
+def test_sampling_drops_idle_loop_samples():
+    result = asyncio.run(ProfilingService().profile(0.2))
+    assert result["samples"] == 0
+    assert result["collapsed"] == ""
+    assert result["top"] == []
+
+
+def _asgi_app(work):
+    async def app(scope, receive, send):
+        work(0.02)
+        await asyncio.sleep(0)
+    return app
+
+
+def test_path_filter_only_samples_matching_requests():
+    service = ProfilingService()
+
+    async def router(scope, receive, send):
+        await (_asgi_app(burn) if scope["path"] == "/work" else _asgi_app(spin))(scope, receive, send)
+
+    middleware = ProfilingMiddleware(router, service)
+
+    async def requests(path):
+        for _ in range(15):
+            await middleware({"type": "http", "path": path}, None, None)
+
+    async def run():
+        session = asyncio.create_task(service.profile(0.4, path_filter="/work"))
+        await asyncio.sleep(0)
+        await asyncio.gather(requests("/work"), requests("/other"))
+        return await session
+
+    result = asyncio.run(run())
+    assert result["samples"] > 0
+    assert "burn (" in result["collapsed"]
+    assert "spin (" not in result["collapsed"]
+
+
+def test_request_from_previous_session_does_not_touch_next_session():
+    service = ProfilingService()
+
+    async def run():
+        release = asyncio.Event()
+
+        async def slow_app(scope, receive, send):
+            await release.wait()
+
+        async def fast_app(scope, receive, send):
+            await asyncio.sleep(0.05)
+
+        first = asyncio.create_task(service.profile(0.02, mode=CPROFILE_MODE, path_filter="/work"))
+        await asyncio.sleep(0)
+        stale = asyncio.create_task(ProfilingMiddleware(slow_app, service)({"type": "http", "path": "/work"}, None, None))
+        await first
+
+        second = asyncio.create_task(service.profile(0.2, mode=CPROFILE_MODE, path_filter="/work"))
+        await asyncio.sleep(0)
+        session = service.match("/work")
+        current = asyncio.create_task(ProfilingMiddleware(fast_app, service)({"type": "http", "path": "/work"}, None, None))
+        await asyncio.sleep(0.01)
+        assert session.in_flight == 1
+
+        release.set()
+        await stale
+        assert session.in_flight == 1
+
+        await current
+        assert session.in_flight == 0
+        await second
+
+    asyncio.run(run())